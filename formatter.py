@@ -74,5 +74,15 @@ def print_last_queries(last5: list[tuple]):
     colored = [(color_by_type(t, t), color_by_type(t, q), str(r)) for (t, q, r) in last5]
     print(format_table(colored, headers=["Тип запроса", "Запрос", "Найдено фильмов"]))
 
-
-
+def print_size_report(report: list[tuple]):
+    """
+    Выводит таблицу пробного прогона архивации: сколько записей и байт будет перенесено в архив.
+    :param report: Список кортежей вида (период, количество записей, примерный размер в байтах).
+    :return: None
+    """
+    print(Fore.CYAN + Style.BRIGHT + "\n=== Записи для архивации ===")
+    if not report:
+        print("Нет записей старше срока хранения.")
+        return
+    total = ("Всего", sum(r[1] for r in report), sum(r[2] for r in report))
+    print(format_table(report + [total], headers=["Период", "Записей", "Размер, байт (прибл.)"]))
@@ -0,0 +1,245 @@
+import gzip
+import os
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+load_dotenv()                                              # До импорта mongo_log_writer: он читает MONGO_* при импорте (нужно при запуске по cron)
+from bson.json_util import dumps, RELAXED_JSON_OPTIONS
+from pymongo import ASCENDING
+from mongo_log_writer import connect_mongo, connect_summary_mongo, is_mongo_available
+from log_stats import extract_type_and_query
+from app_logger import logger
+
+
+def read_int_env(name: str, default: int | None) -> int | None:
+    """
+    Читает положительное целое число из переменной окружения.
+    :param name: Имя переменной окружения.
+    :param default: Значение по умолчанию, если переменная не задана, не является числом или не больше нуля.
+    :return: Целое число или default.
+    """
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:                                        # 0 и отрицательные значения отправили бы в архив все записи, включая свежие
+        logger.warning(f"Некорректное значение {name}={value!r}, используется {default}")
+        return default
+    return number
+
+
+LOG_RETENTION_DAYS = read_int_env("LOG_RETENTION_DAYS", 90)
+LOG_TTL_DAYS = read_int_env("LOG_TTL_DAYS", None)          # Если не задано — TTL-индекс не создаётся
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "archive")
+BATCH_SIZE = 1000
+STALE_CLAIM_MINUTES = 60                                   # Через сколько минут незавершённая пачка считается брошенной
+
+
+def get_cutoff(days: int = LOG_RETENTION_DAYS) -> datetime:
+    """
+    Вычисляет границу хранения: записи старше этой даты подлежат архивации.
+    :param days: Сколько дней хранить сырые записи.
+    :return: Дата и время границы.
+    """
+    return datetime.now() - timedelta(days=days)
+
+
+def get_period(log: dict) -> str:
+    """
+    Возвращает период (месяц) записи лога в виде строки "ГГГГ-ММ".
+    :param log: Словарь с данными одного лога.
+    :return: Строка периода, например "2025-08".
+    """
+    created = log.get("createdAt")
+    return created.strftime("%Y-%m") if isinstance(created, datetime) else "unknown"
+
+
+def count_by_period(logs: list[dict]) -> dict[tuple, int]:
+    """
+    Считает запросы по периодам так же, как get_top_queries: записи без типа или без текста запроса пропускаются.
+    :param logs: Список логов.
+    :return: Словарь {(период, тип, текст запроса): количество}.
+    """
+    counts = {}
+    for log in logs:
+        if not log.get("type", "").strip():
+            continue
+        t, q = extract_type_and_query(log)
+        if q:
+            key = (get_period(log), t, q)
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def ensure_created_at_index(collection) -> None:
+    """
+    Создаёт обычный индекс по createdAt, если по этому полю ещё нет никакого индекса (в том числе TTL).
+    :param collection: Коллекция с сырыми логами.
+    :return: None
+    """
+    if not any(info["key"] == [("createdAt", 1)] for info in collection.index_information().values()):
+        collection.create_index("createdAt")
+    collection.create_index("archiving.id", sparse=True)
+
+
+def archive_old_logs(days: int = LOG_RETENTION_DAYS) -> int:
+    """
+    Переносит записи старше days дней в сжатые помесячные архивы,
+    обновляет сводные счётчики по периодам и удаляет перенесённые записи из коллекции.
+    Сначала дозавершает пачки, брошенные прошлыми запусками, затем захватывает новые.
+    :param days: Сколько дней хранить сырые записи.
+    :return: Количество заархивированных записей. При ошибке — 0.
+    """
+    collection = connect_mongo()
+    summary = connect_summary_mongo()
+    if collection is None or summary is None:
+        logger.error("Невозможно архивировать логи: нет подключения к MongoDB")
+        return 0
+    try:
+        os.makedirs(LOG_ARCHIVE_DIR, exist_ok=True)
+        ensure_created_at_index(collection)
+        summary.create_index([("period", ASCENDING), ("type", ASCENDING), ("query", ASCENDING)], unique=True)
+        summary.create_index("batches")
+        archived = 0
+
+        for batch_id in summary.distinct("batches"):           # Метки пачек, упавших между delete_many и $pull
+            if collection.count_documents({"archiving.id": batch_id}, limit=1) == 0:
+                summary.update_many({"batches": batch_id}, {"$pull": {"batches": batch_id}})
+
+        stale = datetime.now() - timedelta(minutes=STALE_CLAIM_MINUTES)
+        for batch_id in collection.distinct("archiving.id", {"archiving.at": {"$lt": stale}}):
+            archived += archive_batch(collection, summary, batch_id)
+
+        cutoff = get_cutoff(days)
+        while True:
+            ids = [log["_id"] for log in collection.find(
+                {"createdAt": {"$lt": cutoff}, "archiving": {"$exists": False}}, {"_id": 1}
+            ).limit(BATCH_SIZE)]
+            if not ids:
+                break
+            batch_id = uuid.uuid4().hex
+            collection.update_many(                                 # Захватываем записи: параллельный запуск возьмёт только незахваченные
+                {"_id": {"$in": ids}, "archiving": {"$exists": False}},
+                {"$set": {"archiving": {"id": batch_id, "at": datetime.now()}}}
+            )
+            archived += archive_batch(collection, summary, batch_id)
+        logger.info(f"Заархивировано записей MongoDB: {archived}")
+        return archived
+    except Exception as e:
+        logger.error(f"Ошибка архивации логов MongoDB: {e}", exc_info=True)
+        return 0
+
+
+def archive_batch(collection, summary, batch_id: str) -> int:
+    """
+    Архивирует пачку записей, захваченных под batch_id. Повторный запуск с тем же batch_id безопасен:
+    уже записанный файл пачки не переписывается, а счётчик, уже увеличенный этой пачкой, повторно не увеличивается.
+    :param collection: Коллекция с сырыми логами.
+    :param summary: Коллекция со сводными счётчиками.
+    :param batch_id: Идентификатор пачки.
+    :return: Количество удалённых записей.
+    """
+    logs = list(collection.find({"archiving.id": batch_id}))
+    if not logs:
+        return 0
+
+    by_period = {}
+    for log in logs:
+        log.pop("archiving", None)
+        by_period.setdefault(get_period(log), []).append(log)
+    for period, period_logs in by_period.items():
+        path = os.path.join(LOG_ARCHIVE_DIR, f"search_logs_{period}_{batch_id}.jsonl.gz")
+        if os.path.exists(path):                            # Файл пачки уже записан полностью прошлым запуском
+            continue
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            for log in period_logs:
+                f.write(dumps(log, json_options=RELAXED_JSON_OPTIONS, ensure_ascii=False) + "\n")
+        os.replace(path + ".tmp", path)
+
+    for (p, t, q), c in count_by_period(logs).items():
+        key = {"period": p, "type": t, "query": q}
+        # Сначала создаём документ сводки: фильтр только на равенство, поэтому сервер сам повторяет
+        # upsert при гонке двух запусков. Затем увеличиваем счётчик, только если пачка ещё не учтена.
+        summary.update_one(key, {"$setOnInsert": {"count": 0, "batches": []}}, upsert=True)
+        summary.update_one({**key, "batches": {"$ne": batch_id}}, {"$inc": {"count": c}, "$push": {"batches": batch_id}})
+
+    result = collection.delete_many({"archiving.id": batch_id})
+    summary.update_many({"batches": batch_id}, {"$pull": {"batches": batch_id}})
+    return result.deleted_count
+
+
+def get_size_report(days: int = LOG_RETENTION_DAYS) -> list[tuple]:
+    """
+    Пробный прогон (dry-run): считает, сколько записей и примерно сколько байт будет заархивировано, без изменений в базе.
+    :param days: Сколько дней хранить сырые записи.
+    :return: Список кортежей вида (период, количество записей, примерный размер в байтах). При ошибке — пустой список.
+    """
+    collection = connect_mongo()
+    if collection is None:
+        logger.error("Невозможно построить отчёт: нет подключения к MongoDB")
+        return []
+    try:
+        stats = collection.database.command("collStats", collection.name)
+        avg_size = stats.get("avgObjSize", 0)
+        pipeline = [
+            {"$match": {"createdAt": {"$lt": get_cutoff(days)}}},
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$createdAt"}}, "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        return [(row["_id"], row["count"], int(row["count"] * avg_size)) for row in collection.aggregate(pipeline)]
+    except Exception as e:
+        logger.error(f"Ошибка построения отчёта о размере логов: {e}", exc_info=True)
+        return []
+
+
+def ensure_ttl_index(ttl_days: int) -> int:
+    """
+    Создаёт или обновляет TTL-индекс по полю createdAt, чтобы MongoDB сама удаляла старые записи.
+    TTL удаляет записи без архивации, поэтому срок должен быть больше LOG_RETENTION_DAYS —
+    тогда индекс лишь страхует от разрастания коллекции, если архивация давно не запускалась.
+    :param ttl_days: Срок жизни записи в днях.
+    :return: 1 — если индекс создан или обновлён, 0 — при ошибке или слишком коротком сроке.
+    """
+    if ttl_days <= LOG_RETENTION_DAYS:
+        logger.warning(f"TTL ({ttl_days} дн.) должен быть больше срока хранения ({LOG_RETENTION_DAYS} дн.), индекс не создан")
+        return 0
+    collection = connect_mongo()
+    if collection is None:
+        logger.error("Невозможно создать TTL-индекс: нет подключения к MongoDB")
+        return 0
+    # createdAt пишется как datetime.now() без часового пояса (локальное время), а TTL считает его UTC,
+    # поэтому фактический срок жизни сдвинут на смещение часового пояса сервера приложения.
+    seconds = ttl_days * 24 * 60 * 60
+    try:
+        existing = [info for info in collection.index_information().values() if info["key"] == [("createdAt", 1)]]
+        if not existing:
+            collection.create_index("createdAt", expireAfterSeconds=seconds)
+        elif existing[0].get("expireAfterSeconds") != seconds:
+            collection.database.command("collMod", collection.name,
+                                        index={"keyPattern": {"createdAt": 1}, "expireAfterSeconds": seconds})
+        logger.info(f"TTL-индекс по createdAt: {ttl_days} дн.")
+        return 1
+    except Exception as e:
+        logger.error(f"Ошибка создания TTL-индекса: {e}", exc_info=True)
+        return 0
+
+
+def run_retention() -> None:
+    """
+    Запускает обслуживание коллекции логов: TTL-индекс (если задан LOG_TTL_DAYS) и архивацию старых записей.
+    Если MongoDB недоступна, ничего не делает.
+    :return: None
+    """
+    if not is_mongo_available():
+        logger.warning("MongoDB недоступна, архивация логов пропущена")
+        return
+    if LOG_TTL_DAYS:
+        ensure_ttl_index(LOG_TTL_DAYS)
+    archive_old_logs()
+
+
+if __name__ == "__main__":
+    run_retention()                                         # Для периодического запуска по расписанию (cron): python log_retention.py
@@ -1,5 +1,5 @@
 
-from mongo_log_writer import connect_mongo
+from mongo_log_writer import connect_mongo, connect_summary_mongo
 from formatter import print_top_queries, print_last_queries
 from app_logger import logger
 
@@ -14,7 +14,8 @@ def show_stats() -> None:
     """
     try:
         logs = fetch_logs()
-        top5 = get_top_queries(logs)
+        archived = fetch_archived_counts()
+        top5 = get_top_queries(logs, archived)
         print_top_queries(top5)
         
 
@@ -40,15 +41,33 @@ def fetch_logs() -> list[dict]:
     return logs
 
 
+def fetch_archived_counts() -> dict[tuple, int]:
+    """
+    Получает сводные счётчики запросов, перенесённых в архив (см. log_retention).
+    :return: Словарь {(тип, текст запроса): количество}. Если ошибка — пустой словарь.
+    """
+    summary = connect_summary_mongo()
+    if summary is None:
+        logger.error("Не удалось получить коллекцию сводки из MongoDB")
+        return {}
+    try:
+        pipeline = [{"$group": {"_id": {"type": "$type", "query": "$query"}, "count": {"$sum": "$count"}}}]
+        return {(row["_id"]["type"], row["_id"]["query"]): row["count"] for row in summary.aggregate(pipeline)}
+    except Exception as e:
+        logger.error(f"Ошибка чтения сводки из MongoDB: {e}", exc_info=True)
+        return {}
+
+
 # === Топ 5 популярных запросов ===
 
-def get_top_queries(logs: list[dict]) -> list[tuple]:         
+def get_top_queries(logs: list[dict], archived: dict[tuple, int] | None = None) -> list[tuple]:         
     """
     Получает топ-5 самых популярных запросов из списка логов.
     :param logs: Список логов (каждый лог — словарь).
+    :param archived: Счётчики заархивированных запросов {(тип, текст запроса): количество}.
     :return: Список кортежей вида ((тип, текст запроса), количество повторений).
     """
-    counter = {}                                              
+    counter = dict(archived or {})                             # Начинаем со счётчиков из архива, чтобы статистика не терялась после архивации
     for log in logs:
         t, q = extract_type_and_query(log)                     # Извлекаем из лога тип запроса (t, например "keyword" или "genre_year") и (q, например "Horror (2020-2023)").
         if t and q:                                            # Если тип, и строка запроса не пустые — учитываем.
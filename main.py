@@ -1,6 +1,9 @@
+import os
 from mysql_connector import get_connection, search_by_title, search_by_genre_and_year
 from mongo_log_writer import log_search, close_mongo_client, client
 from log_stats import show_stats  
+from log_retention import run_retention, get_size_report
+from formatter import print_size_report
 from app_logger import logger
 
 
@@ -18,6 +21,13 @@ def main() -> None:
 
     print("Добро пожаловать в систему поиска фильмов!")
 
+    # MongoDB: архивация при запуске только по флагу, обычно её запускают по расписанию (python log_retention.py)
+    if os.getenv("LOG_RETENTION_ON_START") == "1":
+        try:
+            run_retention()
+        except Exception:
+            logger.error("Ошибка при архивации логов", exc_info=True)
+
     # MySQL: открываем одно соединение и один курсор
     try:
         with get_connection() as connection:
@@ -27,6 +37,8 @@ def main() -> None:
                     print("1. Поиск по названию")
                     print("2. Поиск по жанру и диапазону годов ")
                     print("3. Статистика запросов")
+                    print("4. Отчёт о записях для архивации")
+                    print("5. Архивировать старые запросы")
                     print("0. Выход")
 
                     choice = input("Сделайте ваш выбор и нажмите 'Enter': ").strip()
@@ -54,6 +66,21 @@ def main() -> None:
                             logger.error("Ошибка при показе статистики", exc_info=True)
                             print("Ошибка при выводе статистики.")
 
+                    elif choice == "4":
+                        try:
+                            print_size_report(get_size_report())
+                        except Exception:
+                            logger.error("Ошибка при построении отчёта об архивации", exc_info=True)
+                            print("Ошибка при построении отчёта.")
+
+                    elif choice == "5":
+                        try:
+                            run_retention()
+                            print("Архивация завершена.")
+                        except Exception:
+                            logger.error("Ошибка при архивации логов", exc_info=True)
+                            print("Ошибка при архивации.")
+
                     elif choice == "0":
                         print("Выход из программы. До свидания!")
                         break
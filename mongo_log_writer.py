@@ -7,6 +7,7 @@ from app_logger import logger
 mongo_url = os.getenv("MONGO_URL")
 mongo_db_name = os.getenv("MONGO_DB")
 mongo_collection_name = os.getenv("MONGO_COLLECTION")
+mongo_summary_collection_name = os.getenv("MONGO_SUMMARY_COLLECTION", f"{mongo_collection_name}_summary")
 client = MongoClient(mongo_url)
 
 
@@ -23,7 +24,33 @@ def connect_mongo():
     except Exception as e:
         logger.error(f"Ошибка подключения к MongoDB: {e}", exc_info=True)
         return None
+
+def connect_summary_mongo():
+    """
+    Возвращает коллекцию со сводными счётчиками заархивированных запросов.
+    :return: Коллекция MongoDB, если подключение успешно. Иначе — None.
+    """
+    try:
+        db = client[mongo_db_name]
+        return db[mongo_summary_collection_name]
+    except Exception as e:
+        logger.error(f"Ошибка подключения к коллекции сводки MongoDB: {e}", exc_info=True)
+        return None
     
+def is_mongo_available(timeout_ms: int = 2000) -> bool:
+    """
+    Быстро проверяет доступность MongoDB (ping с коротким таймаутом выбора сервера).
+    :param timeout_ms: Таймаут в миллисекундах.
+    :return: True — если сервер ответил, иначе False.
+    """
+    try:
+        with MongoClient(mongo_url, serverSelectionTimeoutMS=timeout_ms) as probe:
+            probe.admin.command("ping")
+        return True
+    except Exception as e:
+        logger.warning(f"MongoDB недоступна: {e}")
+        return False
+
 def log_search(data: dict) -> int:
     """
     Записывает данные поиска в MongoDB с текущей датой и временем.
@@ -0,0 +1,228 @@
+import gzip
+import glob
+import os
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from bson.json_util import loads
+import log_retention
+from log_retention import get_period, count_by_period, archive_batch, archive_old_logs, read_int_env
+from log_stats import get_top_queries
+
+
+def get_field(doc: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None, False
+        doc = doc[part]
+    return doc, True
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for path, cond in query.items():
+        value, exists = get_field(doc, path)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(cond, dict):
+            if "$exists" in cond and cond["$exists"] != exists:
+                return False
+            if "$lt" in cond and not (exists and value < cond["$lt"]):
+                return False
+            if "$ne" in cond and cond["$ne"] in values:
+                return False
+            if "$in" in cond and not any(v in cond["$in"] for v in values):
+                return False
+        elif cond not in values:
+            return False
+    return True
+
+
+class FakeCursor(list):
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+
+class FakeCollection:
+    """Минимальная замена коллекции MongoDB: поддерживает только то, что использует log_retention."""
+
+    def __init__(self, docs=None):
+        self.docs = [dict(d) for d in docs or []]
+        self.fail_delete = False
+
+    def index_information(self):
+        return {}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find(self, query, projection=None):
+        return FakeCursor(dict(d) for d in self.docs if matches(d, query))
+
+    def count_documents(self, query, limit=0):
+        return len(self.find(query))
+
+    def distinct(self, path, query=None):
+        result = []
+        for doc in self.find(query or {}):
+            value, exists = get_field(doc, path)
+            for v in (value if isinstance(value, list) else [value]) if exists else []:
+                if v not in result:
+                    result.append(v)
+        return result
+
+    def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if matches(doc, query):
+                self.apply(doc, update, inserted=False)
+                return
+        if upsert:
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            self.apply(doc, update, inserted=True)
+            self.docs.append(doc)
+
+    def update_many(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                self.apply(doc, update, inserted=False)
+
+    def delete_many(self, query):
+        if self.fail_delete:
+            raise RuntimeError("network")
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        return type("Result", (), {"deleted_count": before - len(self.docs)})()
+
+    @staticmethod
+    def apply(doc, update, inserted):
+        if inserted:
+            doc.update(update.get("$setOnInsert", {}))
+        doc.update(update.get("$set", {}))
+        for k, v in update.get("$inc", {}).items():
+            doc[k] = doc.get(k, 0) + v
+        for k, v in update.get("$push", {}).items():
+            doc.setdefault(k, []).append(v)
+        for k, v in update.get("$pull", {}).items():
+            doc[k] = [x for x in doc.get(k, []) if x != v]
+
+
+def search(keyword: str, created: datetime, batch_id: str | None = None) -> dict:
+    doc = {"_id": ObjectId(), "type": "keyword", "keyword": keyword, "results": 1, "createdAt": created}
+    if batch_id:
+        doc["archiving"] = {"id": batch_id, "at": datetime.now()}
+    return doc
+
+
+def archive_lines(path) -> int:
+    return sum(len(gzip.open(f, "rt").readlines()) for f in glob.glob(os.path.join(path, "*.jsonl.gz")))
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_retention, "LOG_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(log_retention.logger, "disabled", True)      # Не пишем в app.log из тестов
+    return tmp_path
+
+
+def test_get_period():
+    assert get_period({"createdAt": datetime(2025, 8, 31, 23, 59)}) == "2025-08"
+    assert get_period({}) == "unknown"
+
+
+@pytest.mark.parametrize("value, expected", [("30", 30), ("0", 90), ("-5", 90), ("abc", 90), ("", 90)])
+def test_read_int_env_accepts_only_positive(monkeypatch, value, expected):
+    monkeypatch.setenv("LOG_RETENTION_DAYS_TEST", value)
+    assert read_int_env("LOG_RETENTION_DAYS_TEST", 90) == expected
+
+
+def test_count_by_period_skips_empty_type_and_query():
+    logs = [
+        {"type": "keyword", "keyword": "love", "createdAt": datetime(2025, 1, 5)},
+        {"type": "keyword", "keyword": "love", "createdAt": datetime(2025, 1, 20)},
+        {"type": "keyword", "keyword": "love", "createdAt": datetime(2025, 2, 1)},
+        {"type": "genre_year", "genre_name": "Horror", "year_from": 2020, "year_to": 2023,
+         "createdAt": datetime(2025, 2, 1)},
+        {"type": "", "keyword": "ignored", "createdAt": datetime(2025, 2, 1)},
+        {"type": "keyword", "keyword": "", "createdAt": datetime(2025, 2, 1)},
+    ]
+    assert count_by_period(logs) == {
+        ("2025-01", "keyword", "love"): 2,
+        ("2025-02", "keyword", "love"): 1,
+        ("2025-02", "genre_year", "Horror (2020-2023)"): 1,
+    }
+
+
+def test_get_top_queries_merges_archived_counts():
+    logs = [{"type": "keyword", "keyword": "love"}, {"type": "keyword", "keyword": "war"}]
+    archived = {("keyword", "love"): 3, ("genre_year", "Horror (2020-2023)"): 2}
+    assert get_top_queries(logs, archived) == [
+        (("keyword", "love"), 4),
+        (("genre_year", "Horror (2020-2023)"), 2),
+        (("keyword", "war"), 1),
+    ]
+    assert archived == {("keyword", "love"): 3, ("genre_year", "Horror (2020-2023)"): 2}
+
+
+def test_archive_batch_round_trip(archive_dir):
+    doc = {"_id": ObjectId(), "type": "keyword", "keyword": "любовь", "results": 2,
+           "createdAt": datetime(2025, 1, 5, 12, 34, 56, 789000)}
+    collection = FakeCollection([dict(doc, archiving={"id": "b1", "at": datetime.now()})])
+    summary = FakeCollection()
+
+    assert archive_batch(collection, summary, "b1") == 1
+    assert collection.docs == []
+    assert summary.docs == [{"period": "2025-01", "type": "keyword", "query": "любовь", "count": 1, "batches": []}]
+
+    path = os.path.join(archive_dir, "search_logs_2025-01_b1.jsonl.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        restored = [loads(line) for line in f]
+    assert [{**r, "createdAt": r["createdAt"].replace(tzinfo=None)} for r in restored] == [doc]
+
+
+def test_archive_batch_retry_after_failed_delete_counts_once(archive_dir):
+    collection = FakeCollection([search("love", datetime(2025, 1, 5), "b1") for _ in range(3)])
+    summary = FakeCollection()
+
+    collection.fail_delete = True                       # Сбой между записью сводки и delete_many
+    with pytest.raises(RuntimeError):
+        archive_batch(collection, summary, "b1")
+    collection.fail_delete = False
+
+    assert archive_batch(collection, summary, "b1") == 3
+    assert archive_batch(collection, summary, "b1") == 0
+    assert collection.docs == []
+    assert [(d["count"], d["batches"]) for d in summary.docs] == [(3, [])]
+    assert archive_lines(archive_dir) == 3
+
+
+def test_archive_batch_different_batches_accumulate(archive_dir):
+    collection = FakeCollection([search("love", datetime(2025, 1, 5), "b1"),
+                                 search("love", datetime(2025, 1, 6), "b2"),
+                                 search("love", datetime(2025, 1, 7), "b2")])
+    summary = FakeCollection()
+
+    archive_batch(collection, summary, "b1")
+    archive_batch(collection, summary, "b2")
+
+    assert [d["count"] for d in summary.docs] == [3]
+    assert archive_lines(archive_dir) == 3
+
+
+def test_archive_old_logs_recovers_stale_claim_and_orphan_marker(archive_dir, monkeypatch):
+    old = datetime.now() - timedelta(days=200)
+    stale_batch = [search("love", old, "stale") for _ in range(2)]
+    collection = FakeCollection(stale_batch + [search("love", old) for _ in range(3)] + [search("war", datetime.now())])
+    summary = FakeCollection([{"period": "2000-01", "type": "keyword", "query": "x", "count": 1, "batches": ["gone"]}])
+    monkeypatch.setattr(log_retention, "connect_mongo", lambda: collection)
+    monkeypatch.setattr(log_retention, "connect_summary_mongo", lambda: summary)
+
+    collection.fail_delete = True                       # Прошлый запуск упал после записи сводки
+    with pytest.raises(RuntimeError):
+        archive_batch(collection, summary, "stale")
+    collection.fail_delete = False
+    for doc in collection.docs:
+        if "archiving" in doc:
+            doc["archiving"]["at"] = old
+
+    assert archive_old_logs(days=90) == 5
+    assert [d["keyword"] for d in collection.docs] == ["war"]
+    assert {d["query"]: (d["count"], d["batches"]) for d in summary.docs} == {"x": (1, []), "love": (5, [])}
+    assert archive_lines(archive_dir) == 5